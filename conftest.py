@@ -0,0 +1,35 @@
+"""
+Shared pytest fixtures for the SODA Core Snowflake FastAPI Validator tests
+"""
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Single TestClient for the session so app startup/shutdown runs exactly once"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    """Async client driving the app in-process, so endpoint tests can fire requests concurrently"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as test_client:
+        yield test_client
+
+
+def pytest_collection_modifyitems(config, items):
+    """Benchmarks are opt-in: skip them unless pytest-benchmark runs with --benchmark-only"""
+    if config.pluginmanager.hasplugin("benchmark") and config.getoption("benchmark_only"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmark; run with pytest --benchmark-only")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip_benchmark)
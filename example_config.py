@@ -127,6 +127,9 @@ ADVANCED_CUSTOM_METRICS = {
 }
 
 # Example 4: Time-based data quality monitoring
+# ${scan_minute} is filled in by the API with the scan time truncated to the minute (UTC).
+# Unlike CURRENT_TIMESTAMP it keeps the query text stable, so Snowflake's result cache
+# can answer repeated scans within the same minute.
 TIME_BASED_MONITORING = {
     "snowflake_config": {
         "account": "your_account.snowflakecomputing.com",
@@ -146,7 +149,7 @@ TIME_BASED_MONITORING = {
                                device_type,
                                country_code
                         FROM user_events
-                        WHERE event_timestamp >= DATEADD(hour, -2, CURRENT_TIMESTAMP)
+                        WHERE event_timestamp >= DATEADD(hour, -2, '${scan_minute}'::TIMESTAMP_TZ)
                         """,
     "validation_rules": """
   # Freshness and volume checks
@@ -164,7 +167,7 @@ TIME_BASED_MONITORING = {
         SELECT 
           COUNT(DISTINCT event_type) as unique_event_types
         FROM user_events
-        WHERE event_timestamp >= DATEADD(hour, -2, CURRENT_TIMESTAMP)
+        WHERE event_timestamp >= DATEADD(hour, -2, '${scan_minute}'::TIMESTAMP_TZ)
       warn: when < 5
       fail: when < 3
 
@@ -175,7 +178,7 @@ TIME_BASED_MONITORING = {
         FROM (
           SELECT session_id, COUNT(*) as event_count
           FROM user_events 
-          WHERE event_timestamp >= DATEADD(hour, -2, CURRENT_TIMESTAMP)
+          WHERE event_timestamp >= DATEADD(hour, -2, '${scan_minute}'::TIMESTAMP_TZ)
           GROUP BY session_id
         ) session_stats
 """,
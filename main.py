@@ -6,19 +6,28 @@ data quality checks without subprocess calls.
 """
 
 import asyncio
-import gc
+import hashlib
 import logging
+import os
+import secrets
 import threading
 import time
 import traceback
-import uuid
-from concurrent.futures import ThreadPoolExecutor
-from contextlib import contextmanager
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-from fastapi import BackgroundTasks, FastAPI, HTTPException
+import anyio
+import yaml
+from cachetools import TTLCache
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from soda.execution.data_source import DataSource
 from soda.scan import Scan
 
 # Configure logging
@@ -28,25 +37,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close pooled Snowflake connections when the server shuts down"""
+    yield
+    soda_service.connection_pool.close_all()
+
+
 app = FastAPI(
     title="SODA Core Snowflake Validator",
     description="Data quality validation for custom Snowflake queries using SODA Core",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
+# Add CORS middleware. Set CORS_ALLOW_ORIGIN_REGEX (e.g. r"https://(.*\.)?yourdomain\.com")
+# to restrict origins in production; the wildcard is only used when it is unset.
+cors_allow_origin_regex = os.getenv("CORS_ALLOW_ORIGIN_REGEX")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[] if cors_allow_origin_regex else ["*"],
+    allow_origin_regex=cors_allow_origin_regex,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight responses for 24h
 )
 
+# Compress large validation responses (check results, failed rows and logs)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 # Pydantic models
 class SnowflakeConfig(BaseModel):
     """Snowflake connection configuration"""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     account: str = Field(..., description="Snowflake account identifier")
     username: str = Field(..., description="Snowflake username")
     password: str = Field(..., description="Snowflake password")
@@ -59,6 +87,8 @@ class SnowflakeConfig(BaseModel):
 
 class ValidationRequest(BaseModel):
     """Request model for data validation"""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     snowflake_config: SnowflakeConfig
     custom_sql_query: Optional[str] = Field(default=None, description="Custom SQL query to validate (optional)")
     table_name: Optional[str] = Field(default=None, description="Table name for standard validation (optional)")
@@ -68,6 +98,8 @@ class ValidationRequest(BaseModel):
 
 class CheckResult(BaseModel):
     """Individual validation check result"""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     name: str
     table: Optional[str]
     column: Optional[str]
@@ -78,7 +110,11 @@ class CheckResult(BaseModel):
 
 class ValidationResponse(BaseModel):
     """Response model for validation results"""
-    scan_id: str
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
+    scan_id: str = Field(
+        ..., description="16-character hex scan identifier, also used in server logs"
+    )
     status: str
     exit_code: int
     data_quality_score: float
@@ -89,12 +125,22 @@ class ValidationResponse(BaseModel):
     check_results: List[CheckResult]
     failed_rows_sample: Optional[List[Dict[str, Any]]] = None
     execution_time_seconds: Optional[float] = None
+    cached: bool = Field(
+        False,
+        description="True when served from the result cache; timings are from the original scan"
+    )
     logs: Optional[str] = None
 
 
+# Validates a whole list of check results in a single pydantic-core call
+_CHECK_RESULTS_ADAPTER = TypeAdapter(List[CheckResult])
+
+
 class SODAValidationError(Exception):
     """Custom exception for SODA validation errors"""
 
+    __slots__ = ('error_type', 'message', 'details')
+
     def __init__(self, error_type: str, message: str, details: Dict[str, Any] = None):
         self.error_type = error_type
         self.message = message
@@ -102,107 +148,319 @@ class SODAValidationError(Exception):
         super().__init__(message)
 
 
+# libyaml-backed loader/dumper when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+_PASSWORD_PLACEHOLDER = "__PWD__"
+# The dedicated password line; user scalars are quoted/indented so they can never produce it
+_PASSWORD_LINE = f"\n  password: {_PASSWORD_PLACEHOLDER}\n"
+_YAML_MAX_WIDTH = 2 ** 31 - 1  # Never fold long scalars across lines
+_MAX_LOG_CHARS = 16384  # Keep only the tail of large scan logs in responses
+_MAX_FAILED_ROWS_PER_CHECK = 10
+_MAX_FAILED_ROWS_SAMPLE = 50
+# Index into the per-scan outcome counters; anything else is counted as "other"
+_OUTCOME_INDEX = {'pass': 0, 'fail': 1, 'warn': 2}
+_OTHER_OUTCOME_INDEX = 3
+# Snowflake cancels scan queries after this long; the request-level timeout is only a safety net
+_STATEMENT_TIMEOUT_SECONDS = 290
+_REQUEST_TIMEOUT_SECONDS = 310.0
+
+
+@lru_cache(maxsize=128)
+def _render_snowflake_config_yaml(
+        account: str,
+        username: str,
+        database: str,
+        warehouse: str,
+        schema: str,
+        role: Optional[str],
+        connection_timeout: Optional[int],
+        data_source_name: str
+) -> str:
+    """Render Snowflake configuration YAML, with the password left as a placeholder"""
+    # Emitted from a dict so user-supplied values are always quoted/escaped as YAML scalars
+    config = {
+        f"data_source {data_source_name}": {
+            "type": "snowflake",
+            "account": account,
+            "username": username,
+            "password": _PASSWORD_PLACEHOLDER,
+            "database": database,
+            "warehouse": warehouse,
+            "schema": schema,
+            "role": role,
+            "connection_timeout": connection_timeout,
+            "client_session_keep_alive": True,
+            "session_parameters": {
+                "QUERY_TAG": "soda-data-quality-api",
+                "STATEMENT_TIMEOUT_IN_SECONDS": _STATEMENT_TIMEOUT_SECONDS,
+            },
+        }
+    }
+    return yaml.dump(config, Dumper=_YAML_DUMPER, default_flow_style=False, sort_keys=False)
+
+
+@lru_cache(maxsize=256)
+def _render_validation_rules(mode: str, target: str, validation_rules: str) -> str:
+    """Render SodaCL checks for a custom query, a table, or raw check definitions"""
+    if mode == "query":
+        # For custom queries, wrap the query in parentheses for SODA
+        return f"""
+# Custom SQL query validation
+checks for ({target}):
+{validation_rules}
+"""
+    elif mode == "table":
+        # For table validation
+        return f"""
+# Table validation
+checks for {target}:
+{validation_rules}
+"""
+    else:
+        # Assume validation_rules contains the full check definition
+        return validation_rules
+
+
+class SnowflakeConnectionPool:
+    """Keeps idle Snowflake connections, one per connection config, for reuse across scans"""
+
+    def __init__(self, max_connections: int = 32, idle_timeout: float = 600.0):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout  # Seconds a pooled connection may sit unused
+        # pool_key -> (connection, monotonic time it was released), least recently used first
+        self.connections: "OrderedDict[Any, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def attach(self, scan: Scan, data_source_name: str, pool_key: Any) -> bool:
+        """
+        Check out a pooled connection for the scan's data source.
+
+        The connection leaves the pool, so no other scan can use it until it is released.
+        Returns False when SODA must open its own connection.
+        """
+        properties = scan._configuration.data_source_properties_by_name.get(data_source_name)
+        if not properties:
+            return False
+
+        with self.lock:
+            to_close = self._pop_idle()
+            entry = self.connections.pop(pool_key, None)
+        for stale in to_close:
+            self._close(stale)
+
+        # Heartbeat outside the lock: a session that expired server-side is replaced, not reused
+        connection = entry[0] if entry is not None else None
+        if connection is not None and not connection.is_valid():
+            self._close(connection)
+            connection = None
+
+        with self.lock:
+            if connection is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+            hits, misses = self.hits, self.misses
+
+        data_source = DataSource.create(
+            scan._logs, data_source_name, properties["type"], properties
+        )
+        data_source.connection = connection
+        scan._data_source_manager.data_sources[data_source_name] = data_source
+        logger.info(
+            f"Reusing pooled Snowflake connection (reuse rate {hits / (hits + misses):.0%})"
+        )
+        return True
+
+    def release(self, scan: Scan, data_source_name: str, pool_key: Any) -> None:
+        """Return the scan's connection to the pool, or close it if the scan hit errors"""
+        data_source = scan._data_source_manager.data_sources.get(data_source_name)
+        connection = getattr(data_source, "connection", None)
+        if connection is None or connection.is_closed():
+            return
+        if scan.has_error_logs():
+            # The session may be broken or mid-transaction; let the next scan open a fresh one
+            self._close(connection)
+            return
+
+        with self.lock:
+            to_close = self._pop_idle()
+            displaced = self.connections.pop(pool_key, None)
+            if displaced is not None:
+                # A concurrent scan with the same config released its own connection first
+                to_close.append(displaced[0])
+            self.connections[pool_key] = (connection, time.monotonic())
+            while len(self.connections) > self.max_connections:
+                # Pooled connections are idle, so evicted ones can be closed safely
+                to_close.append(self.connections.popitem(last=False)[1][0])
+
+        for stale in to_close:
+            self._close(stale)
+
+    def close_all(self) -> None:
+        """Close every pooled connection (called on application shutdown)"""
+        with self.lock:
+            to_close = [connection for connection, _ in self.connections.values()]
+            self.connections.clear()
+        for connection in to_close:
+            self._close(connection)
+
+    def _pop_idle(self) -> List[Any]:
+        """Remove connections idle past idle_timeout; the caller holds the lock and closes them"""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        # Entries are kept in release order, so the idle ones are all at the front
+        while self.connections:
+            pool_key, (connection, released_at) = next(iter(self.connections.items()))
+            if released_at > cutoff:
+                break
+            del self.connections[pool_key]
+            expired.append(connection)
+        return expired
+
+    @staticmethod
+    def _close(connection: Any) -> None:
+        """Close a connection that is no longer pooled"""
+        try:
+            connection.close()
+        except Exception as e:
+            logger.warning(f"Failed to close Snowflake connection: {str(e)}")
+
+
+@lru_cache(maxsize=256)
+def _check_sodacl_yaml(sodacl_yaml_str: str) -> None:
+    """
+    Malformed-YAML guard: reject rules SODA could not parse before a connection is opened.
+
+    Only well-formed rule strings are remembered (exceptions are not cached) and no parsed
+    tree is kept, since SODA parses the string again itself.
+    """
+    yaml.compose(sodacl_yaml_str, Loader=_YAML_LOADER)
+
+
 class ThreadSafeSODAService:
     """Thread-safe SODA Core validation service"""
 
     def __init__(self, max_workers: int = 4):
         self.scan_lock = threading.Lock()  # Critical for YAML emitter thread safety
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.limiter = anyio.CapacityLimiter(max_workers)  # Max concurrent scans in worker threads
+        self.connection_pool = SnowflakeConnectionPool(
+            idle_timeout=float(os.getenv("SODA_POOL_IDLE_TIMEOUT", "600"))
+        )
+        # Cache of recent scan results, keyed by a hash of the connection config and rules
+        self.result_cache: TTLCache = TTLCache(
+            maxsize=512, ttl=int(os.getenv("SODA_CACHE_TTL", "300"))
+        )
+        self.cache_lock = threading.Lock()
+        # In-flight scans, so concurrent identical requests share a single backend scan
+        self.pending: Dict[str, asyncio.Future] = {}
 
     @contextmanager
     def safe_scan_execution(self, scan_id: str):
-        """Context manager ensuring thread-safe SODA scan execution"""
-        with self.scan_lock:  # Prevents YAML emitter errors in concurrent execution
-            try:
-                scan = Scan()
-                scan.set_verbose(True)
-                scan.set_is_local(True)  # Prevent Soda Cloud integration overhead
-                yield scan
-            finally:
-                # Clean up resources
-                del scan
-                gc.collect()
+        """Context manager providing a fresh SODA scan and cleaning it up afterwards"""
+        scan = Scan()
+        try:
+            scan.set_verbose(True)
+            yield scan
+        finally:
+            # Drop the reference and leave collection to the regular generational GC
+            del scan
 
     def _build_snowflake_config_yaml(self, config: SnowflakeConfig, data_source_name: str) -> str:
         """Build Snowflake configuration YAML"""
-        return f"""
-data_source {data_source_name}:
-  type: snowflake
-  account: {config.account}
-  username: {config.username}
-  password: {config.password}
-  database: {config.database}
-  warehouse: {config.warehouse}
-  schema: {config.schema}
-  role: {config.role}
-  connection_timeout: {config.connection_timeout}
-  client_session_keep_alive: true
-  session_parameters:
-    QUERY_TAG: soda-data-quality-api
-"""
+        config_yaml = _render_snowflake_config_yaml(
+            config.account,
+            config.username,
+            config.database,
+            config.warehouse,
+            config.schema,
+            config.role,
+            config.connection_timeout,
+            data_source_name
+        )
+        # Emit the password as a double-quoted scalar with the same dumper, so any password
+        # (quotes, newlines, non-BMP characters) stays a single value that round-trips exactly
+        password_scalar = yaml.dump(
+            config.password,
+            Dumper=_YAML_DUMPER,
+            default_style='"',
+            allow_unicode=True,
+            width=_YAML_MAX_WIDTH
+        ).rstrip("\n")
+        return config_yaml.replace(_PASSWORD_LINE, f"\n  password: {password_scalar}\n", 1)
 
     def _build_validation_rules(self, request: ValidationRequest) -> str:
         """Build validation rules for custom query or table"""
+        rules = request.validation_rules
         if request.custom_sql_query:
-            # For custom queries, wrap the query in parentheses for SODA
-            return f"""
-# Custom SQL query validation
-checks for ({request.custom_sql_query}):
-{request.validation_rules}
-"""
+            return _render_validation_rules("query", request.custom_sql_query, rules)
         elif request.table_name:
-            # For table validation
-            return f"""
-# Table validation
-checks for {request.table_name}:
-{request.validation_rules}
-"""
+            return _render_validation_rules("table", request.table_name, rules)
         else:
-            # Assume validation_rules contains the full check definition
-            return request.validation_rules
-
-    def _extract_results(self, scan: Scan, start_time: float, end_time: float) -> Dict[str, Any]:
+            return _render_validation_rules("raw", "", rules)
+
+    def _build_cache_key(self, request: ValidationRequest, include_logs: bool = False) -> str:
+        """Build the result cache key for a validation request"""
+        return hashlib.sha256("|".join([
+            request.snowflake_config.model_dump_json(),
+            self._build_validation_rules(request),
+            str(include_logs)
+        ]).encode()).hexdigest()
+
+    def _extract_results(
+            self,
+            scan: Scan,
+            start_time: float,
+            end_time: float,
+            include_logs: bool = False
+    ) -> Dict[str, Any]:
         """Extract and process validation results"""
         scan_results = scan.get_scan_results()
         checks = scan_results.get('checks', [])
 
-        # Count outcomes
-        passed = len([c for c in checks if c.get('outcome') == 'pass'])
-        failed = len([c for c in checks if c.get('outcome') == 'fail'])
-        warnings = len([c for c in checks if c.get('outcome') == 'warn'])
-        total = len(checks)
-
-        # Calculate data quality score
-        data_quality_score = passed / total if total > 0 else 0.0
-
-        # Extract check results
+        # Count outcomes and extract check results in a single pass
+        counts = [0, 0, 0, 0]
         check_results = []
         failed_rows_sample = []
 
         for check in checks:
-            check_result = CheckResult(
-                name=check.get('name', check.get('definition', 'unnamed')),
-                table=check.get('table'),
-                column=check.get('column'),
-                outcome=check.get('outcome', 'unknown'),
-                value=check.get('checkValue'),
-                message=check.get('message')
-            )
+            outcome = check.get('outcome', 'unknown')
+            outcome_index = _OUTCOME_INDEX.get(outcome, _OTHER_OUTCOME_INDEX)
+            counts[outcome_index] += 1
+
+            check_result = {
+                'name': check.get('name', check.get('definition', 'unnamed')),
+                'table': check.get('table'),
+                'column': check.get('column'),
+                'outcome': outcome,
+                'value': check.get('checkValue'),
+                'message': check.get('message')
+            }
             check_results.append(check_result)
 
-            # Extract failed rows if available
-            if check.get('outcome') in ['fail', 'warn']:
+            # Extract failed rows for fail/warn checks, until the sample is full
+            sample_full = len(failed_rows_sample) >= _MAX_FAILED_ROWS_SAMPLE
+            if (outcome_index == 1 or outcome_index == 2) and not sample_full:
                 diagnostics = check.get('diagnostics', {})
                 for block in diagnostics.get('blocks', []):
                     if 'failedRows' in block and block['failedRows']:
-                        failed_rows_sample.extend([
-                            {
-                                'check_name': check_result.name,
-                                'table': check_result.table,
+                        for row in block['failedRows'][:_MAX_FAILED_ROWS_PER_CHECK]:
+                            if len(failed_rows_sample) >= _MAX_FAILED_ROWS_SAMPLE:
+                                break
+                            failed_rows_sample.append({
+                                'check_name': check_result['name'],
+                                'table': check_result['table'],
                                 'failed_row': row
-                            }
-                            for row in block['failedRows'][:10]  # Limit to 10 samples per check
-                        ])
+                            })
+
+        passed, failed, warnings = counts[0], counts[1], counts[2]
+
+        # Calculate data quality score
+        total = len(checks)
+        data_quality_score = passed / total if total > 0 else 0.0
 
         # Determine status
         if failed > 0:
@@ -212,23 +470,36 @@ checks for {request.table_name}:
         else:
             status = "passed"
 
+        # Errored scans (exit code 3) report no failed checks, so their logs are the only diagnostic
+        return_logs = include_logs or failed > 0 or scan.has_error_logs()
+
         return {
             'status': status,
-            'exit_code': scan.execute() if hasattr(scan, '_exit_code') else (0 if failed == 0 else 2),
+            # Overwritten with scan.execute()'s result by the caller
+            'exit_code': 0 if failed == 0 else 2,
             'data_quality_score': data_quality_score,
             'passed_checks': passed,
             'failed_checks': failed,
             'warning_checks': warnings,
             'total_checks': total,
-            'check_results': check_results,
-            'failed_rows_sample': failed_rows_sample[:50],  # Limit total samples
+            'check_results': _CHECK_RESULTS_ADAPTER.validate_python(check_results),
+            'failed_rows_sample': failed_rows_sample,
             'execution_time_seconds': end_time - start_time,
-            'logs': scan.get_logs_text()
+            'logs': self._extract_logs(scan) if return_logs else None
         }
 
-    async def execute_validation(self, request: ValidationRequest, scan_id: str) -> Dict[str, Any]:
+    def _extract_logs(self, scan: Scan) -> Optional[str]:
+        """Extract the tail of the scan logs"""
+        logs = scan.get_logs_text()
+        return logs[-_MAX_LOG_CHARS:] if logs else logs
+
+    async def execute_validation(
+            self,
+            request: ValidationRequest,
+            scan_id: str,
+            include_logs: bool = False
+    ) -> Dict[str, Any]:
         """Execute SODA validation with comprehensive error handling"""
-        import time
         start_time = time.time()
 
         try:
@@ -239,16 +510,61 @@ checks for {request.table_name}:
                     "Either custom_sql_query or table_name must be provided"
                 )
 
-            # Execute validation in thread pool
-            result = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self._execute_scan_sync,
-                request,
-                scan_id,
-                start_time
-            )
+            # Serve repeated requests from the result cache
+            cache_key = self._build_cache_key(request, include_logs)
+            with self.cache_lock:
+                cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Scan {scan_id} served from result cache")
+                return {**cached, 'cached': True}
+
+            # Wait for an identical scan that is already running
+            pending = self.pending.get(cache_key)
+            if pending is not None:
+                logger.info(f"Scan {scan_id} waiting on an identical in-flight scan")
+                try:
+                    return dict(await asyncio.shield(pending))
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise  # This request itself was cancelled
+                    raise SODAValidationError("timeout", "Validation execution timed out")
+
+            future = asyncio.get_event_loop().create_future()
+            self.pending[cache_key] = future
+            try:
+                # Execute validation in a worker thread
+                result = await anyio.to_thread.run_sync(
+                    self._execute_scan_sync,
+                    request,
+                    scan_id,
+                    start_time,
+                    include_logs,
+                    limiter=self.limiter
+                )
+            except asyncio.CancelledError:
+                # The owning request timed out; fail waiters with a timeout, not a bare cancel
+                future.set_exception(
+                    SODAValidationError("timeout", "Validation execution timed out")
+                )
+                future.exception()  # Mark as retrieved when nobody else is waiting
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # Mark as retrieved when nobody else is waiting
+                raise
+            else:
+                # Exit code 3+ means SODA logged errors (e.g. connection or query failure)
+                # instead of raising; don't pin such results in the cache for the whole TTL
+                if result['exit_code'] < 3:
+                    with self.cache_lock:
+                        self.result_cache[cache_key] = result
+                future.set_result(result)
+            finally:
+                self.pending.pop(cache_key, None)
+                if not future.done():
+                    future.cancel()
 
-            return result
+            return dict(result)
 
         except SODAValidationError:
             raise
@@ -262,9 +578,22 @@ checks for {request.table_name}:
                 {"traceback": traceback.format_exc()}
             )
 
-    def _execute_scan_sync(self, request: ValidationRequest, scan_id: str, start_time: float) -> Dict[str, Any]:
-        """Synchronous scan execution (called from thread pool)"""
+    def _execute_scan_sync(
+            self,
+            request: ValidationRequest,
+            scan_id: str,
+            start_time: float,
+            include_logs: bool = False
+    ) -> Dict[str, Any]:
+        """Synchronous scan execution (called from a worker thread)"""
         data_source_name = "snowflake_api"
+        validation_rules = self._build_validation_rules(request)
+
+        # Reject malformed rules before creating a scan or opening a Snowflake connection
+        try:
+            _check_sodacl_yaml(validation_rules)
+        except yaml.YAMLError as e:
+            raise SODAValidationError("configuration_error", f"Invalid validation_rules YAML: {e}")
 
         with self.safe_scan_execution(scan_id) as scan:
             try:
@@ -272,20 +601,30 @@ checks for {request.table_name}:
                 scan.set_data_source_name(data_source_name)
                 scan.set_scan_definition_name(request.scan_name)
 
-                # Add Snowflake configuration
+                # Scan time truncated to the minute: queries filtering on ${scan_minute} stay
+                # identical within a minute, so Snowflake can serve them from its result cache
+                scan_minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+                scan.add_variables({"scan_minute": scan_minute.isoformat()})
+
                 config_yaml = self._build_snowflake_config_yaml(request.snowflake_config, data_source_name)
-                scan.add_configuration_yaml_str(config_yaml)
 
-                # Add validation rules
-                validation_rules = self._build_validation_rules(request)
-                scan.add_sodacl_yaml_str(validation_rules)
+                # Only YAML parsing needs serializing; scans run in parallel
+                with self.scan_lock:  # Prevents YAML emitter errors in concurrent execution
+                    scan.add_configuration_yaml_str(config_yaml)
+                    scan.add_sodacl_yaml_str(validation_rules)
+
+                # Reuse an open Snowflake session for this config when one is available
+                pool_key = (request.snowflake_config, data_source_name)
+                self.connection_pool.attach(scan, data_source_name, pool_key)
 
                 # Execute scan
                 exit_code = scan.execute()
                 end_time = time.time()
 
+                self.connection_pool.release(scan, data_source_name, pool_key)
+
                 # Extract results
-                results = self._extract_results(scan, start_time, end_time)
+                results = self._extract_results(scan, start_time, end_time, include_logs)
                 results['exit_code'] = exit_code
 
                 return results
@@ -331,15 +670,23 @@ async def get_validation_examples():
   - failed rows:
       fail query: |
         SELECT * FROM orders 
-        WHERE ship_date < order_date"""
+        WHERE ship_date < order_date""",
+
+        # Use ${scan_minute} instead of CURRENT_TIMESTAMP so repeated scans hit Snowflake's
+        # result cache
+        "time_window_validations": """  - recent_event_count > 0:
+      recent_event_count query: |
+        SELECT COUNT(*) FROM user_events
+        WHERE event_timestamp >= DATEADD(hour, -2, '${scan_minute}'::TIMESTAMP_TZ)"""
     }
     return examples
 
 
-@app.post("/validate", response_model=ValidationResponse)
+@app.post("/validate", response_model=ValidationResponse, response_class=ORJSONResponse)
 async def validate_data(
         request: ValidationRequest,
-        background_tasks: BackgroundTasks
+        background_tasks: BackgroundTasks,
+        include_logs: bool = Query(False, description="Include scan logs even when all checks pass")
 ):
     """
     Execute SODA Core validation against Snowflake data
@@ -349,16 +696,18 @@ async def validate_data(
     2. A table name with validation rules
 
     Returns detailed validation results including data quality score,
-    individual check outcomes, and sample failed rows.
+    individual check outcomes, and sample failed rows. Scan logs are only
+    included when checks fail, when the scan logged errors, or when
+    `include_logs=true` is passed.
     """
-    scan_id = str(uuid.uuid4())
+    scan_id = secrets.token_hex(8)  # 16 hex chars, used to correlate log lines
     logger.info(f"Starting validation scan {scan_id}")
 
     try:
-        # Execute validation with timeout
+        # Snowflake enforces the statement timeout; this only catches scans that never return
         result = await asyncio.wait_for(
-            soda_service.execute_validation(request, scan_id),
-            timeout=300.0  # 5 minute timeout
+            soda_service.execute_validation(request, scan_id, include_logs),
+            timeout=_REQUEST_TIMEOUT_SECONDS
         )
 
         # Log results in background
@@ -376,7 +725,7 @@ async def validate_data(
         logger.error(f"Validation {scan_id} timed out")
         raise HTTPException(
             status_code=408,
-            detail="Validation request timed out after 5 minutes"
+            detail=f"Validation request timed out after {_REQUEST_TIMEOUT_SECONDS:.0f} seconds"
         )
     except SODAValidationError as e:
         logger.error(f"Validation {scan_id} failed: {e.message}")
@@ -401,16 +750,23 @@ async def log_validation_results(scan_id: str, results: Dict[str, Any]):
         f"Failed: {results['failed_checks']}, "
         f"Warnings: {results['warning_checks']}, "
         f"Duration: {results.get('execution_time_seconds', 0):.2f}s"
+        f"{' (cached)' if results.get('cached') else ''}"
     )
 
 
 if __name__ == "__main__":
     import uvicorn
 
+    debug = bool(os.getenv("DEBUG"))
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=debug,
+        workers=None if debug else int(os.getenv("WORKERS", "4")),
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=75,  # Keep idle client connections open between validation calls
         log_level="info"
     )
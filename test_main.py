@@ -4,76 +4,237 @@ Test suite for SODA Core Snowflake FastAPI Validator
 Run with: pytest test_main.py -v
 """
 
-import json
-from unittest.mock import Mock, patch
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+import orjson
 import pytest
-from fastapi.testclient import TestClient
-from main import app, SODAValidationError, ThreadSafeSODAService, SnowflakeConfig, ValidationRequest
+import yaml
+from pydantic import ValidationError
+from soda.scan import Scan
+# Importing main builds the Pydantic core schemas (and the module-level TypeAdapter) once per
+# session/xdist worker; conftest.py shares the same module, so nothing here rebuilds them
+from main import (
+    CheckResult, SODAValidationError, ThreadSafeSODAService, SnowflakeConfig, ValidationRequest,
+    _render_snowflake_config_yaml, _render_validation_rules, get_validation_examples
+)
+
+# Trusted literal, so skip validation; test_snowflake_config_valid still exercises the validator
+_CFG = SnowflakeConfig.model_construct(
+    account="test.snowflakecomputing.com",
+    username="testuser",
+    password="testpass",
+    database="TESTDB",
+    warehouse="TESTWH",
+    schema="PUBLIC",
+    role="PUBLIC",
+    connection_timeout=240
+)
+
+
+# Base request for service-level tests; variants come from model_copy(update=...),
+# which skips validation
+_BASE_REQ = ValidationRequest.model_construct(
+    snowflake_config=_CFG,
+    table_name="CUSTOMERS",
+    validation_rules="- row_count > 0",
+    scan_name="test_scan"
+)
+
+
+@pytest.fixture(scope="module")
+def snowflake_config():
+    """Canonical Snowflake config for tests that don't care how it was built"""
+    return _CFG.model_copy()
+
+
+# Endpoint request bodies, encoded once; tests needing a variant spread the dicts instead
+_BASE_CFG = {
+    "account": "test.snowflakecomputing.com",
+    "username": "testuser",
+    "password": "testpass",
+    "database": "TESTDB",
+    "warehouse": "TESTWH",
+    "schema": "PUBLIC"
+}
+_BASE_REQ_DATA = {
+    "snowflake_config": _BASE_CFG,
+    "table_name": "CUSTOMERS",
+    "validation_rules": "- row_count > 0"
+}
+_BASE_REQ_BYTES = orjson.dumps(_BASE_REQ_DATA)
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+# Canned execute_validation result for endpoint tests that stub out the scan
+_FIXED_RESULT = {
+    'status': 'passed',
+    'exit_code': 0,
+    'data_quality_score': 0.95,
+    'passed_checks': 4,
+    'failed_checks': 0,
+    'warning_checks': 0,
+    'total_checks': 4,
+    'check_results': [
+        {
+            'name': 'row_count > 0',
+            'table': 'CUSTOMERS',
+            'column': None,
+            'outcome': 'pass',
+            'value': 1500,
+            'message': None
+        }
+    ],
+    'failed_rows_sample': [],
+    'execution_time_seconds': 1.23,
+    'logs': 'INFO: Validation completed successfully'
+}
+
+
+# Multi-line SodaCL sample, split once for the rule-shape tests
+_COMPLEX_RULES = """
+  - row_count > 1000
+  - missing_count(email) = 0
+  - duplicate_count(customer_id) = 0
+  - avg(order_amount) between 50 and 500
+  - conversion_rate >= 0.15:
+      conversion_rate query: |
+        SELECT COUNT(CASE WHEN status = 'completed' THEN 1 END) * 1.0 / COUNT(*) 
+        FROM sales_data
+  - failed rows:
+      name: "Invalid order dates"
+      fail query: |
+        SELECT order_id, order_date, ship_date
+        FROM orders 
+        WHERE ship_date < order_date
+"""
+_COMPLEX_LINES = _COMPLEX_RULES.splitlines()
+_COMPLEX_DASH_LINES = [line for line in _COMPLEX_LINES if line.strip().startswith('-')]
+_COMPLEX_MARKERS = frozenset({"conversion_rate query:", "failed rows:", "fail query:"})
+_DASH_LINE_RE = re.compile(rb'(?m)^[ \t]*-\s')
+
+
+class _StubExecute:
+    """Callable stand-in for Mock: records calls, then raises exc or returns result"""
+
+    def __init__(self, result=None, exc=None):
+        self.result, self.exc, self.calls = result, exc, []
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        if self.exc:
+            raise self.exc
+        return self.result
+
 
-# Test client
-client = TestClient(app)
+class _AsyncStubExecute(_StubExecute):
+    """_StubExecute for coroutine functions such as execute_validation"""
+
+    async def __call__(self, *args, **kwargs):
+        return super().__call__(*args, **kwargs)
+
+
+def _stub_scan(checks, logs=None, error_logs=False):
+    """Scan stand-in exposing only what _extract_results reads"""
+    return SimpleNamespace(
+        get_scan_results=_StubExecute({'checks': checks}),
+        get_logs_text=_StubExecute(logs),
+        has_error_logs=_StubExecute(error_logs),
+        execute=_StubExecute()
+    )
+
+
+class _OfflineScan(Scan):
+    """Real Scan (configuration and SodaCL parsing included) whose execute never connects"""
+
+    instances = []
+
+    def __init__(self):
+        super().__init__()
+        self.instances.append(self)
+
+    def execute(self) -> int:
+        # Stand-in for the connection SODA opens when none was attached from the pool
+        self._data_source_manager.data_sources.setdefault(
+            "snowflake_api", SimpleNamespace(connection=_stub_connection())
+        )
+        return 0
+
+    def get_scan_results(self) -> dict:
+        return {'checks': [{'name': 'row_count > 0', 'table': 'CUSTOMERS', 'outcome': 'pass'}]}
+
+
+def _stub_connection(valid=True):
+    """Open Snowflake connection stand-in; valid=False mimics a session expired server-side"""
+    return SimpleNamespace(
+        is_closed=_StubExecute(False), is_valid=_StubExecute(valid), close=_StubExecute()
+    )
+
+
+def rjson(response):
+    """Decode a response body with orjson, the same codec the app responds with"""
+    return orjson.loads(response.content)
+
+
+@pytest.fixture(scope="module")
+def service():
+    """Service shared by tests that only call its stateless helpers"""
+    return ThreadSafeSODAService(max_workers=2)
 
 
 class TestHealthAndInfo:
     """Test basic API endpoints"""
 
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test health check endpoint"""
         response = client.get("/")
         assert response.status_code == 200
         assert response.json()["status"] == "healthy"
         assert "SODA Core Snowflake Validator" in response.json()["service"]
 
-    def test_validation_examples(self):
-        """Test validation rules examples endpoint"""
-        response = client.get("/validation-rules-examples")
-        assert response.status_code == 200
-        data = response.json()
+    async def test_validation_examples(self):
+        """Test validation rules examples (static data, so the handler is called directly)"""
+        data = await get_validation_examples()
         assert "basic_validations" in data
         assert "advanced_validations" in data
         assert "custom_metrics" in data
+        assert "${scan_minute}" in data["time_window_validations"]
         assert "row_count > 0" in data["basic_validations"]
 
 
 class TestPydanticModels:
     """Test Pydantic model validation"""
 
-    def test_snowflake_config_valid(self):
-        """Test valid Snowflake configuration"""
-        config = SnowflakeConfig(
-            account="test.snowflakecomputing.com",
-            username="testuser",
-            password="testpass",
-            database="TESTDB",
-            warehouse="TESTWH",
-            schema="PUBLIC"
-        )
-        assert config.account == "test.snowflakecomputing.com"
-        assert config.role == "PUBLIC"  # default value
-        assert config.connection_timeout == 240  # default value
-
-    def test_snowflake_config_missing_required(self):
-        """Test Snowflake config with missing required fields"""
-        with pytest.raises(ValueError):
-            SnowflakeConfig(
-                account="test.snowflakecomputing.com",
-                username="testuser"
-                # Missing required fields
-            )
-
-    def test_validation_request_valid(self):
+    @pytest.mark.parametrize("kwargs,raises", [
+        (_BASE_CFG, False),
+        # Missing required fields
+        ({"account": "test.snowflakecomputing.com", "username": "testuser"}, True),
+    ], ids=["valid", "missing_required"])
+    def test_snowflake_config_validator_paths(self, kwargs, raises):
+        """Test the Snowflake config validator accepts complete input and rejects missing fields"""
+        if raises:
+            with pytest.raises(ValidationError):
+                SnowflakeConfig(**kwargs)
+        else:
+            assert SnowflakeConfig(**kwargs).account == "test.snowflakecomputing.com"
+
+    def test_default_values(self):
+        """Test Snowflake config defaults (trusted input, so no re-validation needed)"""
+        config = SnowflakeConfig.model_construct(**_BASE_CFG)
+        assert config.role == "PUBLIC"
+        assert config.connection_timeout == 240
+
+    def test_snowflake_config_frozen(self, snowflake_config):
+        """Test Snowflake config is immutable and hashable"""
+        with pytest.raises(ValidationError):
+            snowflake_config.role = "ACCOUNTADMIN"
+        assert hash(snowflake_config) == hash(snowflake_config.model_copy())
+
+    def test_validation_request_valid(self, snowflake_config):
         """Test valid validation request"""
-        config = SnowflakeConfig(
-            account="test.snowflakecomputing.com",
-            username="testuser",
-            password="testpass",
-            database="TESTDB",
-            warehouse="TESTWH",
-            schema="PUBLIC"
-        )
-
         request = ValidationRequest(
-            snowflake_config=config,
+            snowflake_config=snowflake_config,
             table_name="CUSTOMERS",
             validation_rules="- row_count > 0",
             scan_name="test_scan"
@@ -90,21 +251,12 @@ class TestSODAService:
     def test_soda_service_initialization(self):
         """Test SODA service initializes correctly"""
         service = ThreadSafeSODAService(max_workers=2)
-        assert service.executor._max_workers == 2
+        assert service.limiter.total_tokens == 2
         assert service.scan_lock is not None
 
-    def test_build_snowflake_config_yaml(self):
+    def test_build_snowflake_config_yaml(self, service, snowflake_config):
         """Test Snowflake YAML configuration generation"""
-        service = ThreadSafeSODAService()
-        config = SnowflakeConfig(
-            account="test.snowflakecomputing.com",
-            username="testuser",
-            password="testpass",
-            database="TESTDB",
-            warehouse="TESTWH",
-            schema="PUBLIC",
-            role="ANALYST"
-        )
+        config = snowflake_config.model_copy(update={"role": "ANALYST"})
 
         yaml_config = service._build_snowflake_config_yaml(config, "test_source")
 
@@ -114,176 +266,457 @@ class TestSODAService:
         assert "username: testuser" in yaml_config
         assert "role: ANALYST" in yaml_config
         assert "client_session_keep_alive: true" in yaml_config
+        assert "STATEMENT_TIMEOUT_IN_SECONDS: 290" in yaml_config
 
-    def test_build_validation_rules_custom_query(self):
-        """Test validation rules for custom SQL query"""
-        service = ThreadSafeSODAService()
+    def test_build_snowflake_config_yaml_password_not_cached(self, service):
+        """Test the rendered YAML cache is shared across passwords without leaking them"""
 
-        config = SnowflakeConfig(
-            account="test.snowflakecomputing.com",
-            username="testuser",
-            password="testpass",
-            database="TESTDB",
-            warehouse="TESTWH",
-            schema="PUBLIC"
+        first = service._build_snowflake_config_yaml(
+            _CFG.model_copy(update={"password": "first"}), "test_source"
+        )
+        second = service._build_snowflake_config_yaml(
+            _CFG.model_copy(update={"password": "second"}), "test_source"
         )
 
-        request = ValidationRequest(
-            snowflake_config=config,
-            custom_sql_query="SELECT * FROM customers WHERE active = 1",
-            validation_rules="- row_count > 0\n- missing_count(email) = 0"
+        assert 'password: "first"' in first
+        assert 'password: "second"' in second
+        assert "first" not in _render_snowflake_config_yaml(
+            "test.snowflakecomputing.com", "testuser", "TESTDB", "TESTWH", "PUBLIC", "PUBLIC", 240,
+            "test_source"
+        )
+
+    def test_build_snowflake_config_yaml_escapes_values(self, service):
+        """Test user-supplied values cannot inject extra YAML keys"""
+        config = _CFG.model_copy(update={"password": 'pa: "ss#\n', "role": "ANALYST\n  extra: foo"})
+
+        yaml_config = service._build_snowflake_config_yaml(config, "test_source")
+        data_source = yaml.safe_load(yaml_config)["data_source test_source"]
+
+        assert data_source["password"] == config.password
+        assert data_source["role"] == config.role
+        assert "extra" not in data_source
+        assert data_source["session_parameters"]["STATEMENT_TIMEOUT_IN_SECONDS"] == 290
+
+    def test_build_snowflake_config_yaml_placeholder_in_user_value(self, service):
+        """Test a placeholder-like user value is left alone and only the password key is filled"""
+        warehouse = "WH password: __PWD__\n  password: __PWD__\n"
+        config = _CFG.model_copy(update={"password": "secret", "warehouse": warehouse})
+
+        yaml_config = service._build_snowflake_config_yaml(config, "test_source")
+        data_source = yaml.safe_load(yaml_config)["data_source test_source"]
+
+        assert data_source["password"] == "secret"
+        assert data_source["warehouse"] == config.warehouse
+
+    def test_build_snowflake_config_yaml_non_bmp_password(self, service):
+        """Test a password with non-BMP characters reaches SODA's data source properties intact"""
+        password = "p😀wé\u2028\"x"
+        config_yaml = service._build_snowflake_config_yaml(
+            _CFG.model_copy(update={"password": password}), "test_source"
+        )
+
+        scan = Scan()
+        scan.add_configuration_yaml_str(config_yaml)
+
+        properties = scan._configuration.data_source_properties_by_name["test_source"]
+        assert properties["password"] == password
+
+    @pytest.mark.parametrize("kwargs,expected_header", [
+        ({"custom_sql_query": "SELECT * FROM customers WHERE active = 1", "table_name": None},
+         "checks for (SELECT * FROM customers WHERE active = 1):"),
+        ({"table_name": "CUSTOMERS"}, "checks for CUSTOMERS:"),
+    ])
+    def test_build_validation_rules(self, service, kwargs, expected_header):
+        """Test validation rules for custom SQL query and table validation"""
+        request = _BASE_REQ.model_copy(
+            update={"validation_rules": "- row_count > 0\n- missing_count(email) = 0", **kwargs}
         )
 
         rules = service._build_validation_rules(request)
 
-        assert "checks for (SELECT * FROM customers WHERE active = 1):" in rules
+        assert expected_header in rules
         assert "- row_count > 0" in rules
         assert "- missing_count(email) = 0" in rules
 
-    def test_build_validation_rules_table(self):
-        """Test validation rules for table validation"""
+    def test_extract_results_does_not_rerun_scan(self, service):
+        """Test result extraction reads scan results without executing the scan again"""
+        scan = _stub_scan(
+            [
+                {'name': 'row_count > 0', 'table': 'CUSTOMERS', 'outcome': 'pass'},
+                {'name': 'missing_count(email) = 0', 'table': 'CUSTOMERS', 'outcome': 'fail'}
+            ],
+            logs="INFO: done"
+        )
+
+        results = service._extract_results(scan, 0.0, 1.5)
+
+        assert scan.execute.calls == []
+        assert all(isinstance(c, CheckResult) for c in results['check_results'])
+        assert results['exit_code'] == 2
+        assert results['status'] == "failed"
+        assert results['passed_checks'] == 1
+        assert results['failed_checks'] == 1
+        assert results['data_quality_score'] == 0.5
+        assert results['execution_time_seconds'] == 1.5
+        assert results['logs'] == "INFO: done"
+
+    def test_extract_results_counts_outcomes(self, service):
+        """Test warn and unknown outcomes are counted separately from pass/fail"""
+        scan = _stub_scan([
+            {'name': 'a', 'outcome': 'pass'},
+            {'name': 'b', 'outcome': 'warn'},
+            {'name': 'c', 'outcome': 'warn'},
+            {'name': 'd'}
+        ])
+
+        results = service._extract_results(scan, 0.0, 1.0)
+
+        assert results['status'] == "passed_with_warnings"
+        assert results['passed_checks'] == 1
+        assert results['failed_checks'] == 0
+        assert results['warning_checks'] == 2
+        assert results['total_checks'] == 4
+        assert results['check_results'][3].outcome == "unknown"
+
+    def test_extract_results_logs_only_on_failure(self, service):
+        """Test scan logs are omitted for passing scans unless requested"""
+        scan = _stub_scan(
+            [{'name': 'row_count > 0', 'table': 'CUSTOMERS', 'outcome': 'pass'}],
+            logs="x" * 20000
+        )
+
+        assert service._extract_results(scan, 0.0, 1.0)['logs'] is None
+        assert service._extract_results(scan, 0.0, 1.0, include_logs=True)['logs'] == "x" * 16384
+
+    def test_extract_results_logs_on_scan_error(self, service):
+        """Test scan logs are returned when SODA logged errors, even without failed checks"""
+        scan = _stub_scan([], logs="ERROR: Could not connect to Snowflake", error_logs=True)
+
+        results = service._extract_results(scan, 0.0, 1.0)
+
+        assert results['failed_checks'] == 0
+        assert results['logs'] == "ERROR: Could not connect to Snowflake"
+
+    def test_extract_results_caps_failed_rows_sample(self, service):
+        """Test failed rows are capped per check and in total"""
+        scan = _stub_scan([
+            {
+                'name': f'check_{i}',
+                'outcome': 'fail',
+                'diagnostics': {'blocks': [{'failedRows': [{'id': n} for n in range(25)]}]}
+            }
+            for i in range(8)
+        ])
+
+        sample = service._extract_results(scan, 0.0, 1.0)['failed_rows_sample']
+
+        assert len(sample) == 50
+        assert [row['check_name'] for row in sample].count('check_0') == 10
+        assert sample[-1]['check_name'] == 'check_4'
+
+    def test_execute_scan_sync_offline_scan(self, monkeypatch):
+        """Test the scan path configures a real Scan, runs it and extracts its results"""
+        monkeypatch.setattr('main.Scan', _OfflineScan)
+        monkeypatch.setattr(_OfflineScan, 'instances', [])
+        service = ThreadSafeSODAService()
+
+        result = service._execute_scan_sync(_BASE_REQ, "scan-1", time.time())
+
+        (scan,) = _OfflineScan.instances
+        assert scan._scan_definition_name == "test_scan"
+        assert "scan_minute" in scan._variables
+        properties = scan._configuration.data_source_properties_by_name["snowflake_api"]
+        assert properties["password"] == "testpass"
+        assert result['exit_code'] == 0
+        assert result['status'] == 'passed'
+        assert result['total_checks'] == result['passed_checks'] == 1
+
+    def test_connection_pool_reuses_open_connection(self, snowflake_config):
+        """Test scans for the same config reuse a pooled connection, one scan at a time"""
         service = ThreadSafeSODAService()
+        config_yaml = service._build_snowflake_config_yaml(snowflake_config, "snowflake_api")
+        pool_key = (snowflake_config, "snowflake_api")
 
-        config = SnowflakeConfig(
-            account="test.snowflakecomputing.com",
-            username="testuser",
-            password="testpass",
-            database="TESTDB",
-            warehouse="TESTWH",
-            schema="PUBLIC"
+        scan = Scan()
+        scan.add_configuration_yaml_str(config_yaml)
+
+        # Nothing pooled yet, so SODA opens its own connection
+        assert service.connection_pool.attach(scan, "snowflake_api", pool_key) is False
+
+        connection = _stub_connection()
+        scan._data_source_manager.data_sources["snowflake_api"] = SimpleNamespace(
+            connection=connection
         )
+        service.connection_pool.release(scan, "snowflake_api", pool_key)
+
+        next_scan = Scan()
+        next_scan.add_configuration_yaml_str(config_yaml)
+        concurrent_scan = Scan()
+        concurrent_scan.add_configuration_yaml_str(config_yaml)
+
+        assert service.connection_pool.attach(next_scan, "snowflake_api", pool_key) is True
+        data_source = next_scan._data_source_manager.data_sources["snowflake_api"]
+        assert data_source.connection is connection
+        # Checked out exclusively, so a concurrent scan must open its own connection
+        assert service.connection_pool.attach(concurrent_scan, "snowflake_api", pool_key) is False
+        assert connection.close.calls == []
+
+    def test_connection_pool_closes_dropped_connections(self):
+        """Test connections from errored scans and LRU-evicted connections are closed"""
+        pool = ThreadSafeSODAService().connection_pool
+        pool.max_connections = 1
+
+        def finished_scan(connection, error_logs=False):
+            return SimpleNamespace(
+                _data_source_manager=SimpleNamespace(
+                    data_sources={"snowflake_api": SimpleNamespace(connection=connection)}
+                ),
+                has_error_logs=_StubExecute(error_logs)
+            )
 
-        request = ValidationRequest(
-            snowflake_config=config,
-            table_name="CUSTOMERS",
-            validation_rules="- row_count > 100\n- duplicate_count(id) = 0"
+        errored = _stub_connection()
+        pool.release(finished_scan(errored, error_logs=True), "snowflake_api", "a")
+        assert len(errored.close.calls) == 1
+        assert "a" not in pool.connections
+
+        evicted = _stub_connection()
+        pool.release(finished_scan(evicted), "snowflake_api", "a")
+        pool.release(finished_scan(_stub_connection()), "snowflake_api", "b")
+        assert len(evicted.close.calls) == 1
+        assert list(pool.connections) == ["b"]
+
+    def test_connection_pool_replaces_dead_and_idle_connections(self):
+        """Test expired sessions and connections idle past the timeout are closed, not reused"""
+        pool = ThreadSafeSODAService().connection_pool
+        scan = SimpleNamespace(
+            _configuration=SimpleNamespace(
+                data_source_properties_by_name={"snowflake_api": {"type": "snowflake"}}
+            ),
+            _data_source_manager=SimpleNamespace(data_sources={}),
+            has_error_logs=_StubExecute(False)
         )
 
-        rules = service._build_validation_rules(request)
+        dead = _stub_connection(valid=False)
+        pool.connections["a"] = (dead, time.monotonic())
+        assert pool.attach(scan, "snowflake_api", "a") is False
+        assert len(dead.close.calls) == 1
+
+        idle, fresh = _stub_connection(), _stub_connection()
+        pool.connections["a"] = (idle, time.monotonic() - pool.idle_timeout - 1)
+        scan._data_source_manager.data_sources["snowflake_api"] = SimpleNamespace(connection=fresh)
+        pool.release(scan, "snowflake_api", "b")
+        assert len(idle.close.calls) == 1
+        assert list(pool.connections) == ["b"]
+
+        pool.close_all()
+        assert len(fresh.close.calls) == 1
+        assert not pool.connections
+
+    def test_execute_scan_sync_reuses_pooled_connection(self, monkeypatch):
+        """Test the scan path returns its connection to the pool and the next scan reuses it"""
+        monkeypatch.setattr('main.Scan', _OfflineScan)
+        monkeypatch.setattr(_OfflineScan, 'instances', [])
+        service = ThreadSafeSODAService()
+        pool = service.connection_pool
 
-        assert "checks for CUSTOMERS:" in rules
-        assert "- row_count > 100" in rules
-        assert "- duplicate_count(id) = 0" in rules
+        service._execute_scan_sync(_BASE_REQ, "scan-1", time.time())
+        ((connection, _),) = pool.connections.values()
+
+        service._execute_scan_sync(_BASE_REQ, "scan-2", time.time())
+
+        _, second = _OfflineScan.instances
+        data_source = second._data_source_manager.data_sources["snowflake_api"]
+        assert data_source.connection is connection
+        assert (pool.hits, pool.misses) == (1, 1)
+        assert [entry[0] for entry in pool.connections.values()] == [connection]
+        assert connection.close.calls == []
+
+    async def test_execute_validation_result_cache(self, monkeypatch):
+        """Test repeated identical requests are served from the result cache"""
+        service = ThreadSafeSODAService()
+
+        stub = _StubExecute({'status': 'passed', 'exit_code': 0})
+        monkeypatch.setattr(service, '_execute_scan_sync', stub)
+
+        first = await service.execute_validation(_BASE_REQ, "scan-1")
+        second = await service.execute_validation(_BASE_REQ, "scan-2")
+
+        assert first == {'status': 'passed', 'exit_code': 0}
+        assert second == {'status': 'passed', 'exit_code': 0, 'cached': True}
+        assert len(stub.calls) == 1
+
+    async def test_execute_validation_does_not_cache_scan_errors(self, monkeypatch):
+        """Test scans that ended with SODA errors (exit code 3) are re-run rather than cached"""
+        service = ThreadSafeSODAService()
+        stub = _StubExecute({'status': 'passed', 'exit_code': 3})
+        monkeypatch.setattr(service, '_execute_scan_sync', stub)
+
+        await service.execute_validation(_BASE_REQ, "scan-1")
+        await service.execute_validation(_BASE_REQ, "scan-2")
+
+        assert len(stub.calls) == 2
+
+    async def test_execute_validation_shares_in_flight_scan(self, monkeypatch):
+        """Test concurrent identical requests await a single backend scan"""
+        service = ThreadSafeSODAService()
+
+        calls = []
+
+        def slow_scan(*args):
+            calls.append(args)
+            time.sleep(0.05)
+            return {'status': 'passed', 'exit_code': 0}
+
+        monkeypatch.setattr(service, '_execute_scan_sync', slow_scan)
+
+        results = await asyncio.gather(
+            *[service.execute_validation(_BASE_REQ, f"scan-{i}") for i in range(3)]
+        )
+
+        assert results == [{'status': 'passed', 'exit_code': 0}] * 3
+        assert len(calls) == 1
+
+    async def test_execute_validation_waiter_times_out_with_owner(self, monkeypatch):
+        """Test requests sharing a scan get a timeout error when the owning request times out"""
+        service = ThreadSafeSODAService()
+
+        def slow_scan(*args):
+            time.sleep(0.3)
+            return {'status': 'passed', 'exit_code': 0}
+
+        monkeypatch.setattr(service, '_execute_scan_sync', slow_scan)
+
+        async def waiter():
+            await asyncio.sleep(0.05)  # Let the owner register its in-flight scan first
+            return await asyncio.wait_for(
+                service.execute_validation(_BASE_REQ, "scan-2"), timeout=5
+            )
+
+        owner, waiting = await asyncio.gather(
+            asyncio.wait_for(service.execute_validation(_BASE_REQ, "scan-1"), timeout=0.1),
+            waiter(),
+            return_exceptions=True
+        )
+
+        assert isinstance(owner, asyncio.TimeoutError)
+        assert isinstance(waiting, SODAValidationError)
+        assert waiting.error_type == "timeout"
 
 
 class TestValidationEndpoint:
     """Test the main validation endpoint"""
 
-    @patch('main.soda_service.execute_validation')
-    def test_validate_endpoint_success(self, mock_execute):
+    async def test_validate_endpoint_success(self, async_client, monkeypatch):
         """Test successful validation request"""
-        # Mock the validation execution
-        mock_execute.return_value = {
-            'status': 'passed',
-            'exit_code': 0,
-            'data_quality_score': 0.95,
-            'passed_checks': 4,
-            'failed_checks': 0,
-            'warning_checks': 0,
-            'total_checks': 4,
-            'check_results': [
-                {
-                    'name': 'row_count > 0',
-                    'table': 'CUSTOMERS',
-                    'column': None,
-                    'outcome': 'pass',
-                    'value': 1500,
-                    'message': None
-                }
-            ],
-            'failed_rows_sample': [],
-            'execution_time_seconds': 1.23,
-            'logs': 'INFO: Validation completed successfully'
-        }
+        stub = _AsyncStubExecute(_FIXED_RESULT)
+        monkeypatch.setattr('main.soda_service.execute_validation', stub)
 
-        request_data = {
-            "snowflake_config": {
-                "account": "test.snowflakecomputing.com",
-                "username": "testuser",
-                "password": "testpass",
-                "database": "TESTDB",
-                "warehouse": "TESTWH",
-                "schema": "PUBLIC"
-            },
-            "table_name": "CUSTOMERS",
-            "validation_rules": "- row_count > 0",
-            "scan_name": "test_validation"
-        }
+        request_data = {**_BASE_REQ_DATA, "scan_name": "test_validation"}
 
-        response = client.post("/validate", json=request_data)
+        response = await async_client.post("/validate", json=request_data)
 
         assert response.status_code == 200
-        data = response.json()
-        assert data["status"] == "passed"
-        assert data["exit_code"] == 0
-        assert data["data_quality_score"] == 0.95
-        assert data["passed_checks"] == 4
-        assert data["failed_checks"] == 0
+        data = rjson(response)
+        expected_subset = {
+            "status": "passed",
+            "exit_code": 0,
+            "data_quality_score": 0.95,
+            "passed_checks": 4,
+            "failed_checks": 0
+        }
+        assert expected_subset.items() <= data.items()
         assert len(data["check_results"]) == 1
-        assert "scan_id" in data
+        assert len(data["scan_id"]) == 16
+        (request, scan_id, include_logs), _ = stub.calls[0]
+        assert request.scan_name == "test_validation"
+        assert scan_id == data["scan_id"]
+        assert include_logs is False
+
+    async def test_validate_endpoint_compresses_large_response(self, async_client, monkeypatch):
+        """Test large validation responses are gzip-compressed"""
+        large_result = {**_FIXED_RESULT, 'logs': 'INFO: Query executed\n' * 200}
+        monkeypatch.setattr('main.soda_service.execute_validation', _AsyncStubExecute(large_result))
+
+        response = await async_client.post(
+            "/validate",
+            content=_BASE_REQ_BYTES,
+            headers={**_JSON_HEADERS, "Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert rjson(response)["logs"].startswith("INFO: Query executed")
 
-    def test_validate_endpoint_invalid_config(self):
+    async def test_validate_endpoint_invalid_config(self, async_client):
         """Test validation with invalid Snowflake config"""
         request_data = {
+            **_BASE_REQ_DATA,
             "snowflake_config": {
                 "account": "test.snowflakecomputing.com",
                 "username": "testuser"
                 # Missing required fields
-            },
-            "table_name": "CUSTOMERS",
-            "validation_rules": "- row_count > 0"
+            }
         }
 
-        response = client.post("/validate", json=request_data)
+        response = await async_client.post("/validate", json=request_data)
         assert response.status_code == 422  # Validation error
 
-    def test_validate_endpoint_missing_table_and_query(self):
+    async def test_validate_endpoint_missing_table_and_query(self, async_client):
         """Test validation without table name or custom query"""
-        request_data = {
-            "snowflake_config": {
-                "account": "test.snowflakecomputing.com",
-                "username": "testuser",
-                "password": "testpass",
-                "database": "TESTDB",
-                "warehouse": "TESTWH",
-                "schema": "PUBLIC"
-            },
-            # No table_name or custom_sql_query
-            "validation_rules": "- row_count > 0"
-        }
+        # No table_name or custom_sql_query
+        request_data = {k: v for k, v in _BASE_REQ_DATA.items() if k != "table_name"}
+
+        response = await async_client.post("/validate", json=request_data)
+        assert response.status_code == 400  # Configuration error
 
-        response = client.post("/validate", json=request_data)
+    async def test_validate_endpoint_malformed_rules(self, async_client):
+        """Test validation rules that are not valid YAML are rejected before scanning"""
+        request_data = {**_BASE_REQ_DATA, "validation_rules": "  - row_count > 0\n  - [unclosed"}
+
+        response = await async_client.post("/validate", json=request_data)
         assert response.status_code == 400  # Configuration error
+        assert "Invalid validation_rules YAML" in rjson(response)["detail"]["message"]
 
-    @patch('main.soda_service.execute_validation')
-    def test_validate_endpoint_soda_error(self, mock_execute):
+    async def test_validate_endpoint_soda_error(self, async_client, monkeypatch):
         """Test validation endpoint with SODA validation error"""
-        mock_execute.side_effect = SODAValidationError(
+        stub = _AsyncStubExecute(exc=SODAValidationError(
             "scan_execution_error",
             "Failed to connect to Snowflake",
             {"connection_timeout": True}
-        )
+        ))
+        monkeypatch.setattr('main.soda_service.execute_validation', stub)
 
         request_data = {
+            **_BASE_REQ_DATA,
             "snowflake_config": {
+                **_BASE_CFG,
                 "account": "invalid.snowflakecomputing.com",
-                "username": "testuser",
-                "password": "wrongpass",
-                "database": "TESTDB",
-                "warehouse": "TESTWH",
-                "schema": "PUBLIC"
-            },
-            "table_name": "CUSTOMERS",
-            "validation_rules": "- row_count > 0"
+                "password": "wrongpass"
+            }
         }
 
-        response = client.post("/validate", json=request_data)
+        response = await async_client.post("/validate", json=request_data)
 
         assert response.status_code == 500  # Server error for execution errors
-        data = response.json()
-        assert "error_type" in data["detail"]
-        assert data["detail"]["error_type"] == "scan_execution_error"
-        assert "Failed to connect to Snowflake" in data["detail"]["message"]
+        expected_detail = {
+            "error_type": "scan_execution_error",
+            "message": "Failed to connect to Snowflake",
+            "details": {"connection_timeout": True}
+        }
+        assert rjson(response)["detail"] == expected_detail
+
+    async def test_validate_endpoint_concurrent_requests(self, async_client, monkeypatch):
+        """Test concurrent validation requests are served independently"""
+        stub = _AsyncStubExecute(_FIXED_RESULT)
+        monkeypatch.setattr('main.soda_service.execute_validation', stub)
+
+        cases = [{**_BASE_REQ_DATA, "table_name": f"TABLE_{i}"} for i in range(10)]
+
+        responses = await asyncio.gather(*[async_client.post("/validate", json=rd) for rd in cases])
+
+        assert [r.status_code for r in responses] == [200] * len(cases)
+        assert len({rjson(r)["scan_id"] for r in responses}) == len(cases)
+        assert len(stub.calls) == len(cases)
 
 
 class TestSODAValidationError:
@@ -296,6 +729,9 @@ class TestSODAValidationError:
         assert error.message == "Test message"
         assert error.details == {}
         assert str(error) == "Test message"
+        # BaseException always provides __dict__, so pin the slots: fields must not land in it
+        assert SODAValidationError.__slots__ == ('error_type', 'message', 'details')
+        assert error.__dict__ == {}
 
     def test_soda_validation_error_with_details(self):
         """Test SODA validation error with details"""
@@ -311,7 +747,7 @@ class TestSODAValidationError:
 class TestIntegrationScenarios:
     """Integration test scenarios"""
 
-    def test_validation_request_with_custom_query(self):
+    def test_validation_request_with_custom_query(self, service):
         """Test validation request structure for custom query"""
         request_data = {
             "snowflake_config": {
@@ -341,30 +777,69 @@ class TestIntegrationScenarios:
         except Exception as e:
             pytest.fail(f"Request structure validation failed: {e}")
 
+        # The payload is a trusted literal, so skip validation when building the model for the
+        # downstream check; untrusted input must still go through ValidationRequest(**data) so the
+        # validator path stays covered (see test_validate_endpoint_invalid_config)
+        request = _BASE_REQ.model_copy(update={
+            "custom_sql_query": request_data["custom_sql_query"],
+            "table_name": None,
+            "validation_rules": request_data["validation_rules"]
+        })
+        rules = service._build_validation_rules(request)
+        assert f"checks for ({request_data['custom_sql_query']}):" in rules
+
     def test_complex_validation_rules_structure(self):
         """Test complex validation rules parsing"""
-        complex_rules = """
-  - row_count > 1000
-  - missing_count(email) = 0
-  - duplicate_count(customer_id) = 0
-  - avg(order_amount) between 50 and 500
-  - conversion_rate >= 0.15:
-      conversion_rate query: |
-        SELECT COUNT(CASE WHEN status = 'completed' THEN 1 END) * 1.0 / COUNT(*) 
-        FROM sales_data
-  - failed rows:
-      name: "Invalid order dates"
-      fail query: |
-        SELECT order_id, order_date, ship_date
-        FROM orders 
-        WHERE ship_date < order_date
-"""
-
         # Test that complex rules structure is well-formed
-        assert "conversion_rate query:" in complex_rules
-        assert "failed rows:" in complex_rules
-        assert "fail query:" in complex_rules
-        assert len([line for line in complex_rules.split('\n') if line.strip().startswith('-')]) == 5
+        assert all(marker in _COMPLEX_RULES for marker in _COMPLEX_MARKERS)
+        # Four simple checks plus the user-defined metric and failed-rows checks
+        assert len(_COMPLEX_DASH_LINES) == 6
+
+    def test_rules_line_count_via_regex(self):
+        """Test the compiled dash-line regex counts the same checks as the line filter"""
+        assert len(_DASH_LINE_RE.findall(_COMPLEX_RULES.encode())) == len(_COMPLEX_DASH_LINES)
+
+
+@pytest.mark.benchmark
+class TestHotPathBenchmarks:
+    """
+    Micro-benchmarks for helpers on every /validate request (run with: pytest --benchmark-only)
+
+    The plain cases time lru_cache hits; the *_cold_perf cases clear the cache before each round
+    so regressions in the rendering itself show up.
+    """
+
+    def test_build_snowflake_config_yaml_perf(self, benchmark, service, snowflake_config):
+        """Benchmark Snowflake YAML configuration generation"""
+        yaml_config = benchmark(
+            service._build_snowflake_config_yaml, snowflake_config, "test_source"
+        )
+        assert "data_source test_source:" in yaml_config
+
+    def test_build_validation_rules_perf(self, benchmark, service):
+        """Benchmark validation rules rendering"""
+        rules = benchmark(service._build_validation_rules, _BASE_REQ)
+        assert "checks for CUSTOMERS:" in rules
+
+    def test_build_snowflake_config_yaml_cold_perf(self, benchmark, service, snowflake_config):
+        """Benchmark Snowflake YAML generation with an empty render cache (dumper path)"""
+        yaml_config = benchmark.pedantic(
+            service._build_snowflake_config_yaml,
+            args=(snowflake_config, "test_source"),
+            setup=_render_snowflake_config_yaml.cache_clear,
+            rounds=500
+        )
+        assert "data_source test_source:" in yaml_config
+
+    def test_build_validation_rules_cold_perf(self, benchmark, service):
+        """Benchmark validation rules rendering with an empty render cache"""
+        rules = benchmark.pedantic(
+            service._build_validation_rules,
+            args=(_BASE_REQ,),
+            setup=_render_validation_rules.cache_clear,
+            rounds=500
+        )
+        assert "checks for CUSTOMERS:" in rules
 
 
 # Integration test (requires actual Snowflake connection - skip by default)